@@ -1,18 +1,19 @@
 from beanie import init_beanie 
 import motor.motor_asyncio 
-from pymongo.uri_parser import parse_uri  
+import redis.asyncio as redis
 from app.models.user_model import User
-from app.config.settings import Settings
+from app.config.settings import get_settings
 
-settings = Settings()
+settings = get_settings()
 
-async def init_db():
-    """Initialize MongoDB connection with Beanie."""
-    client = motor.motor_asyncio.AsyncIOMotorClient(settings.database_uri)
+# Single Motor client (and connection pool) for the whole process
+client = motor.motor_asyncio.AsyncIOMotorClient(settings.database_uri, maxPoolSize=100, minPoolSize=10)
 
-    parsed_uri = parse_uri(settings.database_uri)
-    database_name = parsed_uri["database"]
+# Shared Redis client (OTP store, caches) reused by every request in the process
+redis_client = redis.Redis.from_url(settings.redis_uri, decode_responses=True)
 
-    database = client[database_name]
+async def init_db():
+    """Initialize Beanie on the shared MongoDB client."""
+    database = client[settings.database_name]
     
     await init_beanie(database, document_models=[User])
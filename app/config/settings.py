@@ -1,7 +1,14 @@
+from functools import lru_cache
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     database_uri: str
+    database_name: str
+    redis_uri: str = "redis://localhost:6379/0"
+    # Number of uvicorn worker processes; shares out per-deployment rate limits
+    web_concurrency: int = 1
+    otp_secret: str
+    phone_hash_secret: str
     twilio_account_sid: str
     twilio_auth_token: str
     twilio_whatsapp_number: str
@@ -16,3 +23,9 @@ class Settings(BaseSettings):
 
     class Config:
         env_file = ".env"
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """Process-wide Settings singleton; .env is read and validated only once."""
+    return Settings()
@@ -1,13 +1,24 @@
 import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from app.config.database import init_db
+from fastapi.responses import ORJSONResponse
+from app.config.database import init_db, client, redis_client
 from app.routes.user_routes import router as user_router
+from app.services import wa_queue
 
-app = FastAPI(title="WAHIRE API", version="0.1")
-
-@app.on_event("startup")
-async def start_db():
+@asynccontextmanager
+async def lifespan(app: FastAPI):
     await init_db()
+    # Open pooled connections up front so the first request doesn't pay for the handshake
+    await client.admin.command("ping")
+    await redis_client.ping()
+    await wa_queue.start()
+    yield
+    await wa_queue.stop()
+    await redis_client.aclose()
+    client.close()
+
+app = FastAPI(title="WAHIRE API", version="0.1", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 @app.get("/")
 async def root():
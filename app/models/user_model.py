@@ -1,13 +1,15 @@
 import uuid
 from beanie import Document
-from pydantic import EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field
+from pymongo import IndexModel, ASCENDING
 from typing import Optional
 from uuid import UUID
 
 class User(Document):
     id: UUID = Field(default_factory=uuid.uuid4, alias="_id")  # UUID as primary key
     name: str = Field(..., title="Full Name", min_length=2)
-    phone: str = Field(..., title="Phone Number", min_length=10, max_length=15)
+    phone: str = Field(..., title="Phone Number (Masked, display only)", min_length=10, max_length=15)
+    phone_hash: Optional[str] = Field(None, title="HMAC-SHA256 of Normalized Phone Number (lookup key)")
     email: Optional[EmailStr] = Field(None, title="Email Address")
     password: Optional[str] = Field(None, title="Password (Hashed)")
     role: str = Field(..., title="User Role")
@@ -18,6 +20,40 @@ class User(Document):
 
     class Settings:
         collection = "users"  
+        indexes = [
+            # Partial so legacy documents without a phone_hash don't collide as nulls
+            IndexModel(
+                [("phone_hash", ASCENDING)],
+                unique=True,
+                partialFilterExpression={"phone_hash": {"$exists": True}},
+            ),
+            IndexModel([("isPhoneVerified", ASCENDING)]),
+        ]
 
-    class Config:
-        json_encoders = {UUID: str}  
+
+# Projections of User; they leave out password and phone_hash on purpose
+
+class UserProfile(BaseModel):
+    """Single-user view of User."""
+    id: UUID = Field(alias="_id")
+    name: str
+    phone: str
+    email: Optional[EmailStr] = None
+    role: str
+    isPhoneVerified: bool
+    job_category: Optional[str] = None
+    job_type: Optional[str] = None
+
+
+class UserListItem(BaseModel):
+    """Listing view of User."""
+    id: UUID = Field(alias="_id")
+    name: str
+    phone: str
+    job_category: Optional[str] = None
+
+
+class UserStatus(BaseModel):
+    """Minimal view of User cached for the OTP resend path."""
+    name: str
+    isPhoneVerified: bool
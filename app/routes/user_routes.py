@@ -1,100 +1,200 @@
+import re
 import uuid
-import random
-import time
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from beanie import PydanticObjectId
-from app.models.user_model import User
-from twilio.rest import Client
-from app.config.settings import Settings
-from passlib.hash import bcrypt
+import hmac
+import hashlib
+import secrets
+from fastapi import APIRouter, HTTPException, Query
+from typing import Annotated, Optional
+from uuid import UUID
+from pydantic import AfterValidator, BaseModel, ConfigDict
+from beanie import PydanticObjectId, UpdateResponse
+from beanie.operators import Exists, Set
+from pymongo.errors import DuplicateKeyError
+from app.models.user_model import User, UserListItem, UserProfile, UserStatus
+from app.config.settings import get_settings
+from app.config.database import redis_client
+from app.services import wa_queue
 
 router = APIRouter()
-settings = Settings()
+settings = get_settings()
 
-twilio_client = Client(settings.twilio_account_sid, settings.twilio_auth_token)
-
-# Temporary in-memory OTP store (for production, use a database or cache like Redis)
-otp_store = {}
+# OTPs live in Redis under "otp:<phone_hash>" and expire natively after OTP_TTL_SECONDS
+OTP_TTL_SECONDS = 300
+# Short-lived read-through cache of the user status resend_otp needs, under "user:<phone_hash>"
+USER_CACHE_TTL_SECONDS = 60
 
 ### ====================== 📌 REQUEST SCHEMAS ====================== ###
-class RegisterSchema(BaseModel):
+def normalize_phone(phone: str) -> str:
+    """Reduces an Indian mobile number to its bare 10 digits (WhatsApp sends go to +91<digits>)."""
+    digits = re.sub(r"[\s\-()]", "", phone)
+    if digits.startswith("+91"):
+        digits = digits[3:]
+    elif len(digits) == 12 and digits.startswith("91"):
+        digits = digits[2:]
+    elif len(digits) == 11 and digits.startswith("0"):
+        digits = digits[1:]
+    if not re.fullmatch(r"[0-9]{10}", digits):
+        raise ValueError("Phone number must be a 10-digit Indian mobile number")
+    return digits
+
+# Phone numbers are normalized at the edge so hashes, keys and sends all agree
+PhoneNumber = Annotated[str, AfterValidator(normalize_phone)]
+
+class RequestSchema(BaseModel):
+    """Base for request bodies: rejects unknown fields and trims whitespace."""
+    model_config = ConfigDict(extra="forbid", validate_assignment=False, str_strip_whitespace=True)
+
+class RegisterSchema(RequestSchema):
     name: str
-    phone: str
+    phone: PhoneNumber
 
-class OTPVerifySchema(BaseModel):
-    phone: str
+class OTPVerifySchema(RequestSchema):
+    phone: PhoneNumber
     otp: str
 
-class OTPResendSchema(BaseModel):
-    phone: str
+class OTPResendSchema(RequestSchema):
+    phone: PhoneNumber
 
-class UpdateUserSchema(BaseModel):
+class UpdateUserSchema(RequestSchema):
     name: str
 
+### ====================== 📌 MESSAGE TEMPLATES ====================== ###
+OTP_REGISTER_TMPL = """
+🔐 *WaHire OTP Verification*
+
+Dear *{name}*,
+
+Your OTP for verification is: *{otp}*
+Valid for *5 minutes*. Do not share it.
+
+Thank you for choosing *WaHire*! 🚀
+"""
+
+VERIFY_SUCCESS_TMPL = """
+🎉 *Welcome to WaHire – Your Trusted Career Partner!* 🎉  
+
+Dear *{name}*,  
+
+✅ *Your account has been successfully verified!*  
+You now have full access to exclusive job opportunities, career insights, and personalized recommendations.  
+
+🚀 *What’s Next?*  
+🔍 *Explore Curated Job Openings:* Find roles that align with your skills and aspirations.  
+💼 *Connect with Top Employers:* Gain direct access to leading organizations.  
+📈 *Enhance Your Professional Profile:* Stay ahead by keeping your profile updated.  
+
+💡 *Pro Tip:* A well-optimized profile increases your chances of landing the perfect job!  
+
+📩 *Need Assistance?* Our support team is here to help: [support@wahire.com](mailto:support@wahire.com).  
+
+We’re excited to be part of your career journey!  
+
+Best Regards,  
+🚀 *The WaHire Team*  
+"""
+
+OTP_RESEND_TMPL = """
+🔐 *WaHire OTP Resend Request*  
+
+Dear *{name}*,  
+
+Your new OTP for verification is: *{otp}*  
+This OTP is valid for *5 minutes*. Do not share it with anyone.  
+
+🚀 Secure your WaHire account and unlock exclusive job opportunities!  
+
+Best Regards,  
+🚀 *The WaHire Team*  
+"""
+
 ### ====================== 📌 UTILITY FUNCTIONS ====================== ###
 
-def generate_otp(phone: str) -> str:
-    """Generates and stores an OTP securely."""
-    otp = ''.join([str(random.randint(0, 9)) for _ in range(6)])
-    hashed_otp = bcrypt.hash(otp)
-    otp_store[phone] = {"otp": hashed_otp, "expires_at": time.time() + 300}  # 5 min expiry
+def otp_key(phone: str) -> str:
+    """Redis key under which the hashed OTP for a phone number is stored."""
+    return f"otp:{hash_phone(phone)}"
+
+def hash_otp(otp: str) -> str:
+    """Keyed HMAC-SHA256 digest of an OTP (cheap enough to run on the event loop)."""
+    return hmac.new(settings.otp_secret.encode(), otp.encode(), hashlib.sha256).hexdigest()
+
+async def generate_otp(phone: str) -> str:
+    """Generates an OTP and stores its hash in Redis with a 5 min TTL."""
+    otp = f"{secrets.randbelow(1_000_000):06d}"
+    hashed_otp = hash_otp(otp)
+    await redis_client.setex(otp_key(phone), OTP_TTL_SECONDS, hashed_otp)
     return otp
 
-async def send_whatsapp_message(to: str, body: str):
-    """Sends a WhatsApp message via Twilio."""
+# Keyed with a server secret: a bare SHA-256 of a 10-digit number is trivially brute-forced.
+# Also used to build Redis keys, so raw phone numbers never appear in the keyspace.
+def hash_phone(phone: str) -> str:
+    """HMAC-SHA256 of the normalized phone number; the unique lookup key for users."""
+    return hmac.new(settings.phone_hash_secret.encode(), phone.encode(), hashlib.sha256).hexdigest()
+
+def user_cache_key(phone: str) -> str:
+    """Redis key under which the cached user status for a phone number is stored."""
+    return f"user:{hash_phone(phone)}"
+
+async def get_user_by_phone_cached(phone: str) -> Optional[UserStatus]:
+    """Looks up a user's status by phone, serving from Redis when possible."""
+    raw = await redis_client.get(user_cache_key(phone))
+    if raw:
+        return UserStatus.model_validate_json(raw)
+
+    # A miss that reads Mongo just before verify_otp's update can write back the unverified
+    # status after verify_otp has invalidated it; that stale entry lives for up to
+    # USER_CACHE_TTL_SECONDS, during which resend_otp may still send an OTP
+    user = await User.find_one(User.phone_hash == hash_phone(phone)).project(UserStatus)
+    if user:
+        await redis_client.setex(user_cache_key(phone), USER_CACHE_TTL_SECONDS, user.model_dump_json())
+    return user
+
+async def invalidate_user_cache(phone: str):
+    """Drops the cached user status; call after every write to the user."""
+    await redis_client.delete(user_cache_key(phone))
+
+async def insert_or_restore_user(user: User, phone: str) -> bool:
+    """Inserts a new user, or restores a soft-deleted one with the same phone.
+
+    Returns False when an active user already owns the phone number.
+    """
+    # The unique index on phone_hash rejects duplicates in the same round-trip as the insert
     try:
-        message = twilio_client.messages.create(
-            from_=f"whatsapp:{settings.twilio_whatsapp_number}",
-            to=f"whatsapp:+91{to}",
-            body=body
-        )
-        return message.sid
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to send message: {str(e)}")
+        await user.insert()
+    except DuplicateKeyError:
+        restored = await User.find_one(
+            User.phone_hash == user.phone_hash, User.isUserDeleted == True
+        ).update(Set({User.isUserDeleted: False, User.name: user.name}))
+        if not restored.modified_count:
+            return False
+        await invalidate_user_cache(phone)
+    return True
 
 def mask_phone(phone: str) -> str:
-    """Masks all but the last 4 digits of a phone number."""
-    return f"{'*' * (len(phone) - 4)}{phone[-4:]}"
+    """Masks all but the last 4 digits of a normalized (10-digit) phone number."""
+    return "******" + phone[-4:]
 
 ### ====================== 📌 USER REGISTRATION ====================== ###
 @router.post("/register")
 async def register_user(user_data: RegisterSchema):
     """Registers a new user and sends OTP via WhatsApp."""
     
-    existing_user = await User.find_one(User.phone == mask_phone(user_data.phone))
-    
-    if existing_user and not existing_user.isUserDeleted:
-        raise HTTPException(status_code=400, detail="User with this phone number already exists.")
-
-    if existing_user and existing_user.isUserDeleted:
-        existing_user.isUserDeleted = False
-        existing_user.name = user_data.name
-        await existing_user.save()
-
-    else:
-        user = User(
-            id=str(uuid.uuid4()), 
-            name=user_data.name,
-            phone=mask_phone(user_data.phone), 
-            role="user",
-            isPhoneVerified=False,
-            isUserDeleted=False
-        )
-        await user.insert()
-
-    otp = generate_otp(user_data.phone)  
-    await send_whatsapp_message(user_data.phone, 
-  f"""
-🔐 *WaHire OTP Verification*
-
-Dear *{user_data.name}*,
+    user = User(
+        id=str(uuid.uuid4()), 
+        name=user_data.name,
+        phone=mask_phone(user_data.phone), 
+        phone_hash=hash_phone(user_data.phone),
+        role="user",
+        isPhoneVerified=False,
+        isUserDeleted=False
+    )
 
-Your OTP for verification is: *{otp}*
-Valid for *5 minutes*. Do not share it.
+    # The OTP must only be written once registration has succeeded, so registering an
+    # already-active phone can never overwrite that user's pending OTP
+    if not await insert_or_restore_user(user, user_data.phone):
+        raise HTTPException(status_code=400, detail="User with this phone number already exists.")
 
-Thank you for choosing *WaHire*! 🚀
-""")
+    otp = await generate_otp(user_data.phone)
+    await wa_queue.put(user_data.phone, OTP_REGISTER_TMPL.format(name=user_data.name, otp=otp))
 
     return {"message": f"User registered successfully. OTP sent to {mask_phone(user_data.phone)}."}
 
@@ -104,49 +204,24 @@ Thank you for choosing *WaHire*! 🚀
 async def verify_otp(otp_data: OTPVerifySchema):
     """Verifies OTP and updates user verification status."""
     
-    otp_entry = otp_store.get(otp_data.phone)
-    if not otp_entry or time.time() > otp_entry["expires_at"]:
-        otp_store.pop(otp_data.phone, None)  
+    stored_otp = await redis_client.get(otp_key(otp_data.phone))
+    if not stored_otp:
         raise HTTPException(status_code=400, detail="OTP expired or invalid")
 
-    if not bcrypt.verify(otp_data.otp, otp_entry["otp"]):
+    if not hmac.compare_digest(stored_otp, hash_otp(otp_data.otp)):
         raise HTTPException(status_code=400, detail="Incorrect OTP")
 
     masked_phone = mask_phone(otp_data.phone)
 
-    user = await User.find_one(User.phone == masked_phone)
+    user = await User.find_one(User.phone_hash == hash_phone(otp_data.phone)).update(
+        Set({User.isPhoneVerified: True}), response_type=UpdateResponse.NEW_DOCUMENT
+    )
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    await invalidate_user_cache(otp_data.phone)
 
-    user.isPhoneVerified = True
-    await user.save()
-
-    otp_store.pop(otp_data.phone, None)
-    await send_whatsapp_message(
-        otp_data.phone,
-        f"""
-🎉 *Welcome to WaHire – Your Trusted Career Partner!* 🎉  
-
-Dear *{user.name}*,  
-
-✅ *Your account has been successfully verified!*  
-You now have full access to exclusive job opportunities, career insights, and personalized recommendations.  
-
-🚀 *What’s Next?*  
-🔍 *Explore Curated Job Openings:* Find roles that align with your skills and aspirations.  
-💼 *Connect with Top Employers:* Gain direct access to leading organizations.  
-📈 *Enhance Your Professional Profile:* Stay ahead by keeping your profile updated.  
-
-💡 *Pro Tip:* A well-optimized profile increases your chances of landing the perfect job!  
-
-📩 *Need Assistance?* Our support team is here to help: [support@wahire.com](mailto:support@wahire.com).  
-
-We’re excited to be part of your career journey!  
-
-Best Regards,  
-🚀 *The WaHire Team*  
-"""
-    )
+    await redis_client.delete(otp_key(otp_data.phone))
+    await wa_queue.put(otp_data.phone, VERIFY_SUCCESS_TMPL.format(name=user.name))
 
     return {"message": f"OTP verified successfully for {masked_phone}."}
 
@@ -158,7 +233,7 @@ async def resend_otp(otp_data: OTPResendSchema):
     
     masked_phone = mask_phone(otp_data.phone)
 
-    user = await User.find_one(User.phone == masked_phone)
+    user = await get_user_by_phone_cached(otp_data.phone)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -167,47 +242,30 @@ async def resend_otp(otp_data: OTPResendSchema):
 
     masked_phone = mask_phone(otp_data.phone)
 
-    otp = generate_otp(otp_data.phone)
-    
-    otp_store[otp_data.phone] = {
-        "otp": bcrypt.hash(otp),
-        "expires_at": time.time() + 300  
-    }
-
-    await send_whatsapp_message(
-        otp_data.phone,
-        f"""
-🔐 *WaHire OTP Resend Request*  
-
-Dear *{user.name}*,  
-
-Your new OTP for verification is: *{otp}*  
-This OTP is valid for *5 minutes*. Do not share it with anyone.  
-
-🚀 Secure your WaHire account and unlock exclusive job opportunities!  
+    otp = await generate_otp(otp_data.phone)
 
-Best Regards,  
-🚀 *The WaHire Team*  
-"""
-    )
+    await wa_queue.put(otp_data.phone, OTP_RESEND_TMPL.format(name=user.name, otp=otp))
 
     return {"message": f"New OTP sent successfully to {masked_phone}."}
 
 
 ### ====================== 📌 FETCH ALL USERS ====================== ###
 @router.get("/get-all-users")
-async def get_all_users():
-    """Fetches all users."""
-    users = await User.find(User.isPhoneVerified == True).to_list()
+async def get_all_users(skip: int = Query(0, ge=0), limit: int = Query(50, ge=1, le=100)):
+    """Fetches a page of verified users."""
+    # Legacy users without a phone_hash can't be reached by phone any more; they must re-register
+    users = await User.find(
+        User.isPhoneVerified == True, Exists(User.phone_hash, True)
+    ).project(UserListItem).skip(skip).limit(limit).to_list()
     return users
 
 
 
 ### ====================== 📌 FETCH USER BY ID ====================== ###
 @router.get("/{user_id}")
-async def get_user_by_id(user_id: str):
+async def get_user_by_id(user_id: UUID):
     """Fetches a user by their ID (UUID)."""
-    user = await User.get(user_id)
+    user = await User.find_one(User.id == user_id).project(UserProfile)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -216,16 +274,12 @@ async def get_user_by_id(user_id: str):
 
 ### ====================== 📌 UPDATE USER ====================== ###
 @router.patch("/{phone}")
-async def update_user(phone: str, user_data: UpdateUserSchema):
+async def update_user(phone: PhoneNumber, user_data: UpdateUserSchema):
     """Updates user details."""
-    masked_phone = mask_phone(phone)
-
-    user = await User.find_one(User.phone == masked_phone)
-    if not user:
+    result = await User.find_one(User.phone_hash == hash_phone(phone)).update(Set({User.name: user_data.name}))
+    if not result.matched_count:
         raise HTTPException(status_code=404, detail="User not found")
-
-    user.name = user_data.name
-    await user.save()
+    await invalidate_user_cache(phone)
 
     return {"message": "User updated successfully"}
 
@@ -233,18 +287,11 @@ async def update_user(phone: str, user_data: UpdateUserSchema):
 
 ### ====================== 📌 SOFT DELETE USER ====================== ###
 @router.delete("/{phone}")
-async def delete_user(phone: str):
-    """Soft deletes a user by setting isUserDeleted = True."""
-@router.delete("/{phone}")
-async def delete_user(phone: str):
+async def delete_user(phone: PhoneNumber):
     """Soft deletes a user by setting isUserDeleted = True."""
-    masked_phone = mask_phone(phone)
-
-    user = await User.find_one(User.phone == masked_phone)
-    if not user:
+    result = await User.find_one(User.phone_hash == hash_phone(phone)).update(Set({User.isUserDeleted: True}))
+    if not result.matched_count:
         raise HTTPException(status_code=404, detail="User not found")
-
-    user.isUserDeleted = True
-    await user.save()
+    await invalidate_user_cache(phone)
 
     return {"message": "User deleted successfully"}
@@ -0,0 +1,15 @@
+import asyncio
+from passlib.hash import argon2
+
+# Argon2 is deliberately slow and CPU-bound; always run it off the event loop
+password_hasher = argon2.using(rounds=3, memory_cost=65536, parallelism=2)
+
+
+async def hash_password(password: str) -> str:
+    """Hashes a password with Argon2 in a worker thread."""
+    return await asyncio.to_thread(password_hasher.hash, password)
+
+
+async def verify_password(password: str, hashed: str) -> bool:
+    """Checks a password against its Argon2 hash in a worker thread."""
+    return await asyncio.to_thread(password_hasher.verify, password, hashed)
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import httpx
+from aiolimiter import AsyncLimiter
+from app.config.settings import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Twilio caps text messages at 25 MPS per sender. The limiter below is per process, so the
+# budget is split evenly across the WEB_CONCURRENCY uvicorn workers sharing that sender.
+TWILIO_MPS = 25
+# Upper bound on concurrent sends per process; a message stuck in 429 backoff holds only its own slot
+MAX_IN_FLIGHT = 50
+MAX_RETRIES = 5
+# How long shutdown waits for queued and in-flight messages to go out
+DRAIN_TIMEOUT_SECONDS = 20
+
+# Single pooled HTTP/2 client for the Twilio REST API, closed on app shutdown
+twilio_http = httpx.AsyncClient(
+    base_url=f"https://api.twilio.com/2010-04-01/Accounts/{settings.twilio_account_sid}/",
+    auth=(settings.twilio_account_sid, settings.twilio_auth_token),
+    http2=True,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+)
+
+limiter = AsyncLimiter(TWILIO_MPS / settings.web_concurrency, 1)
+queue: asyncio.Queue = asyncio.Queue()
+send_slots = asyncio.Semaphore(MAX_IN_FLIGHT)
+dispatchers: list[asyncio.Task] = []
+in_flight: set[asyncio.Task] = set()
+
+
+async def put(to: str, body: str):
+    """Enqueues a WhatsApp message; returns immediately."""
+    await queue.put((to, body))
+
+
+async def send_one(to: str, body: str) -> str:
+    """Sends a single WhatsApp message, backing off exponentially on HTTP 429."""
+    for attempt in range(MAX_RETRIES):
+        await limiter.acquire()
+        response = await twilio_http.post(
+            "Messages.json",
+            data={
+                "From": f"whatsapp:{settings.twilio_whatsapp_number}",
+                "To": f"whatsapp:+91{to}",
+                "Body": body,
+            },
+        )
+        if response.status_code == 429:
+            if attempt < MAX_RETRIES - 1:
+                await asyncio.sleep(2 ** attempt)
+            continue
+        response.raise_for_status()
+        return response.json()["sid"]
+    raise RuntimeError(f"Twilio rate limit still exceeded after {MAX_RETRIES} attempts")
+
+
+async def deliver(to: str, body: str):
+    """Sends one queued message and releases its slot, whatever the outcome."""
+    try:
+        await send_one(to, body)
+    except Exception as e:
+        logger.error("Failed to send WhatsApp message to ******%s: %s", to[-4:], e)
+    finally:
+        send_slots.release()
+        queue.task_done()
+
+
+async def dispatcher():
+    """Starts one send task per queued message, at most MAX_IN_FLIGHT at a time."""
+    while True:
+        to, body = await queue.get()
+        await send_slots.acquire()
+        task = asyncio.create_task(deliver(to, body))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+
+
+async def start():
+    """Launches the queue dispatcher; called on app startup."""
+    dispatchers.append(asyncio.create_task(dispatcher()))
+
+
+async def stop():
+    """Drains the queue, then cancels outstanding sends and closes the Twilio client; called on app shutdown."""
+    try:
+        await asyncio.wait_for(queue.join(), timeout=DRAIN_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        logger.error("Shutting down with %d WhatsApp messages still queued", queue.qsize())
+
+    tasks = [*dispatchers, *in_flight]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    dispatchers.clear()
+    await twilio_http.aclose()